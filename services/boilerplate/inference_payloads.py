@@ -4,7 +4,8 @@
 
 from typing import Annotated, Any, Dict, List, Optional
 
-from pydantic import BaseModel, ConfigDict, Field, field_validator
+import numpy as np
+from pydantic import BaseModel, ConfigDict, Field, field_serializer, field_validator
 
 
 # WARNING: DO NOT IMPORT util here or else you'll get a circular dependency
@@ -313,10 +314,19 @@ class PredictOutput(BaseModel):
         description="Timestamp indicating when the prediction was created. ISO 8601 format.",
         default=None,
     )
-    results: List[Dict[str, List[Any]]] = Field(
+    # values are lists or, for numeric columns, numpy arrays; typed as Any so that
+    # the (potentially long) columns are not validated element by element
+    results: List[Dict[str, Any]] = Field(
         description="List of prediction results.",
         default=None,
     )
 
     input_data_points: int = Field(description="Count of input data points.", default=None)
     output_data_points: int = Field(description="Count of output data points.", default=None)
+
+    @field_serializer("results")
+    def serialize_results(self, results: Optional[List[Dict[str, Any]]]) -> Optional[List[Dict[str, List[Any]]]]:
+        # numpy arrays are converted to lists only here, when the output is dumped
+        if results is None:
+            return None
+        return [{k: v.tolist() if isinstance(v, np.ndarray) else v for k, v in r.items()} for r in results]
@@ -2,16 +2,21 @@
 #
 
 import copy
+import itertools
 import json
 import os
 import tempfile
+import zoneinfo
 from datetime import timedelta
 
 import numpy as np
 import pandas as pd
 import pytest
+import torch
 from fastapi import HTTPException
+from tsfminference import tsfm_inference_handler
 from tsfminference.inference import InferenceRuntime
+from tsfminference.inference_handler import InferenceHandler, encode_dataframe
 from tsfminference.inference_payloads import (
     ForecastingInferenceInput,
     ForecastingMetadataInput,
@@ -76,13 +81,17 @@ def forecasting_input_base() -> ForecastingInferenceInput:
 def _basic_result_checks(results: PredictOutput, df: pd.DataFrame):
     # expected length
     assert len(results) == FORECAST_LENGTH * NUM_TIMESERIES
+    # datetime timestamps are returned as ISO 8601 strings
+    dates = results["date"]
+    if pd.api.types.is_string_dtype(dates):
+        dates = pd.to_datetime(dates, format="ISO8601")
     # expected start time
-    answer = results["date"].iloc[0] - df["date"].iloc[-1]
+    answer = dates.iloc[0] - df["date"].iloc[-1]
     assert (
         answer == timedelta(hours=1) if isinstance(answer, timedelta) else answer == timedelta(hours=1).total_seconds()
     )
     # expected end time
-    answer = results["date"].iloc[-1] - df["date"].iloc[-1]
+    answer = dates.iloc[-1] - df["date"].iloc[-1]
     assert (
         answer == timedelta(hours=FORECAST_LENGTH)
         if isinstance(answer, timedelta)
@@ -90,6 +99,116 @@ def _basic_result_checks(results: PredictOutput, df: pd.DataFrame):
     )
 
 
+@pytest.mark.parametrize(
+    "timestamps",
+    [
+        pd.Series(pd.date_range("2024-01-01", periods=5, freq="h")),
+        pd.Series(pd.date_range("2024-01-01 00:00:00.250", periods=5, freq="1500ms")),
+        pd.Series(pd.date_range("2024-03-10", periods=5, freq="h", tz="America/New_York")),
+        pd.Series(pd.date_range("2024-01-01", periods=5, freq="h", tz="UTC")),
+        pd.Series([pd.Timestamp("2024-01-01 00:00:00"), pd.NaT, pd.Timestamp("2024-01-01 01:00:00")]),
+        pd.Series([pd.Timestamp("2024-01-01", tz="Asia/Kolkata"), pd.NaT]),
+        # fractional parts vary per value, down to nanoseconds
+        pd.Series(
+            pd.to_datetime(
+                ["2024-01-01", "2024-01-01 00:00:00.5", "2024-01-01 00:00:00.000000001", None], format="ISO8601"
+            )
+        ),
+        pd.Series(
+            pd.to_datetime(["2024-01-01 00:00:00.000001001", "2024-01-01 01:00:00"], format="ISO8601").tz_localize(
+                "Europe/Paris"
+            )
+        ),
+        # local mean time, the offset has seconds
+        pd.Series(pd.to_datetime(["1850-01-01", "2024-01-01"]).tz_localize(zoneinfo.ZoneInfo("Europe/Amsterdam"))),
+        pd.Series(pd.date_range("2024-01-01", periods=3, freq="D", unit="s")),
+        pd.Series(pd.DatetimeIndex([], tz="UTC")),
+        pd.Series(pd.DatetimeIndex([pd.NaT, pd.NaT], tz="UTC")),
+        pd.Series(pd.date_range("2024-01-01 00:00:00.001", periods=3, freq="s", unit="ms")),
+    ],
+)
+def test_encode_dataframe_timestamps(timestamps: pd.Series):
+    df = pd.DataFrame({"date": timestamps, "ID": "a", "VAL": np.arange(len(timestamps), dtype=float)})
+    original = df.copy()
+
+    encoded = encode_dataframe(df, timestamp_column="date")
+
+    # the same as formatting each timestamp on its own
+    assert list(encoded["date"]) == [t.isoformat() for t in timestamps]
+    assert encoded["ID"] == ["a"] * len(timestamps)
+    np.testing.assert_array_equal(encoded["VAL"], df["VAL"].to_numpy())
+    pd.testing.assert_frame_equal(df, original)
+
+
+def test_encode_dataframe_extension_dtypes():
+    df = pd.DataFrame(
+        {
+            "INT": pd.array([1, None], dtype="Int64"),
+            "FLOAT": pd.array([1.5, None], dtype="Float64"),
+            "BOOL": pd.array([True, None], dtype="boolean"),
+            "ID": pd.array(["a", None], dtype="string"),
+        }
+    )
+    encoded = encode_dataframe(df)
+
+    assert encoded == df.to_dict(orient="list")
+    assert json.loads(PredictOutput(model_id="test", results=[encoded]).model_dump_json())["results"][0] == {
+        "INT": [1, None],
+        "FLOAT": [1.5, None],
+        "BOOL": [True, None],
+        "ID": ["a", None],
+    }
+
+
+def test_predict_output_serializes_arrays():
+    df = pd.DataFrame(
+        {
+            "date": pd.date_range("2024-01-01", periods=3, freq="h"),
+            "ID": "a",
+            "VAL": [1.0, np.nan, 3.0],
+            "COUNT": np.arange(3),
+        }
+    )
+    encoded = encode_dataframe(df, timestamp_column="date")
+    # numeric columns are kept as arrays until the output is serialized
+    assert isinstance(encoded["VAL"], np.ndarray)
+    po = PredictOutput(model_id="test", results=[encoded])
+
+    dumped = po.model_dump()["results"][0]
+    assert all(type(v) is list for v in dumped.values())
+    assert dumped["COUNT"] == [0, 1, 2]
+    assert type(dumped["COUNT"][0]) is int
+    assert dumped["VAL"][0] == 1.0 and np.isnan(dumped["VAL"][1])
+
+    assert json.loads(po.model_dump_json())["results"][0] == {
+        "date": ["2024-01-01T00:00:00", "2024-01-01T01:00:00", "2024-01-01T02:00:00"],
+        "ID": ["a", "a", "a"],
+        "VAL": [1.0, None, 3.0],
+        "COUNT": [0, 1, 2],
+    }
+
+
+def test_select_device(monkeypatch):
+    monkeypatch.setattr(tsfm_inference_handler, "_DEVICE_COUNTER", itertools.count())
+
+    monkeypatch.setattr(torch.cuda, "is_available", lambda: False)
+    assert tsfm_inference_handler._select_device() == "cpu"
+
+    monkeypatch.setattr(torch.cuda, "is_available", lambda: True)
+    monkeypatch.setattr(torch.cuda, "device_count", lambda: 1)
+    assert tsfm_inference_handler._select_device() == "cuda"
+
+    # requests are spread round-robin over the GPUs
+    monkeypatch.setattr(torch.cuda, "device_count", lambda: 3)
+    assert [tsfm_inference_handler._select_device() for _ in range(5)] == [
+        "cuda:0",
+        "cuda:1",
+        "cuda:2",
+        "cuda:0",
+        "cuda:1",
+    ]
+
+
 def test_forecast_with_decimal_freq(ts_data_base: pd.DataFrame, forecasting_input_base: ForecastingInferenceInput):
     input: ForecastingInferenceInput = forecasting_input_base
     input: ForecastingInferenceInput = copy.deepcopy(input)
@@ -163,6 +282,50 @@ def test_forecast_with_good_data(ts_data_base: pd.DataFrame, forecasting_input_b
     _basic_result_checks(results, df)
 
 
+def test_forecast_run_batch(ts_data_base: pd.DataFrame, forecasting_input_base: ForecastingInferenceInput):
+    input: ForecastingInferenceInput = copy.deepcopy(forecasting_input_base)
+    # the same ids appear in every batch item, they must not be mixed up
+    data_list = [copy.deepcopy(ts_data_base) for _ in range(3)]
+    for i, df in enumerate(data_list):
+        df["VAL"] = df["VAL"] + 10 * i
+
+    handler, e = InferenceHandler.load(model_id=input.model_id, model_path=input.model_id)
+    assert e is None
+    handler, e = handler.prepare(data=data_list[0], schema=input.schema, parameters=input.parameters)
+    assert e is None
+
+    outputs, e = handler.run_batch(data_list, schema=input.schema, parameters=input.parameters)
+    assert e is None
+    assert len(outputs) == len(data_list)
+
+    for df, po in zip(data_list, outputs):
+        expected, e = handler.run(df, schema=input.schema, parameters=input.parameters)
+        assert e is None
+        results = pd.DataFrame.from_dict(po.results[0])
+        _basic_result_checks(results, df)
+        pd.testing.assert_frame_equal(results, pd.DataFrame.from_dict(expected.results[0]), rtol=1e-5)
+        assert po.input_data_points == expected.input_data_points
+        assert po.output_data_points == expected.output_data_points
+
+
+def test_forecast_run_batch_different_freq(
+    ts_data_base: pd.DataFrame, forecasting_input_base: ForecastingInferenceInput
+):
+    input: ForecastingInferenceInput = copy.deepcopy(forecasting_input_base)
+    other = copy.deepcopy(ts_data_base)
+    other["date"] = other["date"] + (other["date"] - other["date"].iloc[0])
+
+    handler, e = InferenceHandler.load(model_id=input.model_id, model_path=input.model_id)
+    assert e is None
+    handler, e = handler.prepare(data=ts_data_base, schema=input.schema, parameters=input.parameters)
+    assert e is None
+
+    outputs, e = handler.run_batch([ts_data_base, other], schema=input.schema, parameters=input.parameters)
+    assert outputs is None
+    assert isinstance(e, ValueError)
+    assert "same frequency" in str(e)
+
+
 def test_forecast_with_schema_missing_target_columns(
     ts_data_base: pd.DataFrame, forecasting_input_base: ForecastingInferenceInput
 ):
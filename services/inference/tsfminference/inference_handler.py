@@ -5,8 +5,11 @@ import logging
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple, Union
 
+import numpy as np
 import pandas as pd
 
+from tsfm_public.toolkit.time_series_preprocessor import estimate_frequency
+
 from .inference_payloads import (
     BaseMetadataInput,
     BaseParameters,
@@ -17,6 +20,11 @@ from .service_handler import HandlerFunction, ServiceHandler
 
 LOGGER = logging.getLogger(__file__)
 
+# artificial id column used to keep the series of different batch items apart
+BATCH_ID_COLUMN = "__tsfm_batch_id__"
+
+_UTC = datetime.timezone.utc
+
 
 class InferenceHandler(ServiceHandler):
     @classmethod
@@ -63,13 +71,15 @@ class InferenceHandler(ServiceHandler):
 
         try:
             result = self.implementation.run(data, schema=schema, parameters=parameters, **kwargs)
-            encoded_result = encode_dataframe(result)
             counts = self.implementation.calculate_data_point_counts(
                 data, output_data=result, schema=schema, parameters=parameters, **kwargs
             )
+            encoded_result = encode_dataframe(
+                result, timestamp_column=schema.timestamp_column if schema is not None else None
+            )
             return PredictOutput(
                 model_id=str(self.implementation.model_id),
-                created_at=datetime.datetime.now().isoformat(),
+                created_at=_created_at(),
                 results=[encoded_result],
                 **counts,
             ), None
@@ -77,8 +87,168 @@ class InferenceHandler(ServiceHandler):
         except Exception as e:
             return None, e
 
+    def run_batch(
+        self,
+        data_list: List[pd.DataFrame],
+        schema: Optional[BaseMetadataInput] = None,
+        parameters: Optional[BaseParameters] = None,
+        future_data_list: Optional[List[pd.DataFrame]] = None,
+        **kwargs,
+    ) -> Tuple[List[PredictOutput], None] | Tuple[None, Exception]:
+        """Perform inference for several independent requests which share a schema and parameters.
+
+        The inputs are concatenated, using an artificial id column to keep the items apart, so that the model is
+        run once over all of them instead of once per item. The handler should be prepared on the first item, all
+        items should have the same frequency as the first one since a single frequency is used for the batch.
+
+        Args:
+            data_list (List[pd.DataFrame]): A list of pandas dataframes containing historical data.
+            schema (Optional[BaseMetadataInput], optional): Service request schema. Defaults to None.
+            parameters (Optional[BaseParameters], optional): Service requst parameters. Defaults to None.
+            future_data_list (Optional[List[pd.DataFrame]], optional): Future data for each of the items in
+                data_list. Defaults to None.
+
+        Returns:
+            Tuple[List[PredictOutput], None] | Tuple[None, Exception]: If successful, returns a tuple containing a list
+                of PredictionOutput objects, one per item in data_list, as the first element. If unsuccessful, a tuple
+                with an exception as the second element will be returned.
+        """
+
+        if not self.prepared:
+            return None, RuntimeError("Service wrapper has not yet been prepared; run `handler.prepare()` first.")
+
+        try:
+            if future_data_list is not None and len(future_data_list) != len(data_list):
+                raise ValueError("When provided, `future_data_list` should have the same length as `data_list`.")
+            if any(BATCH_ID_COLUMN in d.columns for d in data_list):
+                raise ValueError(f"Data should not contain the reserved column name `{BATCH_ID_COLUMN}`.")
+            _check_batch_frequency(data_list, schema)
+
+            batch_schema = schema.model_copy(update={"id_columns": [BATCH_ID_COLUMN] + list(schema.id_columns)})
+            data = _concat_batch(data_list)
+            future_data = _concat_batch(future_data_list) if future_data_list is not None else None
+
+            result = self.implementation.run(
+                data,
+                future_data=future_data,
+                schema=batch_schema,
+                parameters=parameters,
+                extra_id_columns=[BATCH_ID_COLUMN],
+                **kwargs,
+            )
+            results_by_item = dict(iter(result.groupby(BATCH_ID_COLUMN, sort=False)))
+            del result
+
+            created_at = _created_at()
+            outputs = []
+            for i, item_data in enumerate(data_list):
+                item_result = results_by_item.pop(i).drop(columns=BATCH_ID_COLUMN)
+                counts = self.implementation.calculate_data_point_counts(
+                    item_data,
+                    future_data=future_data_list[i] if future_data_list is not None else None,
+                    output_data=item_result,
+                    schema=schema,
+                    parameters=parameters,
+                )
+                outputs.append(
+                    PredictOutput(
+                        model_id=str(self.implementation.model_id),
+                        created_at=created_at,
+                        results=[encode_dataframe(item_result, timestamp_column=schema.timestamp_column)],
+                        **counts,
+                    )
+                )
+            return outputs, None
+
+        except Exception as e:
+            return None, e
+
+
+def _created_at() -> str:
+    """Creation time of a prediction, in UTC and ISO 8601 format with millisecond precision."""
+    return datetime.datetime.now(_UTC).isoformat(timespec="milliseconds")
+
+
+def _check_batch_frequency(data_list: List[pd.DataFrame], schema: BaseMetadataInput):
+    """Check that all items of a batch have the frequency of the first item.
+
+    The frequency is estimated as the TimeSeriesPreprocessor does, from the last timestamps of the first series.
+    """
+    if not schema.timestamp_column:
+        return
+
+    def item_frequency(data: pd.DataFrame):
+        if schema.id_columns:
+            _, data = next(iter(data.groupby(schema.id_columns)))
+        return estimate_frequency(data[schema.timestamp_column])
+
+    expected = item_frequency(data_list[0])
+    for i, data in enumerate(data_list[1:], start=1):
+        freq = item_frequency(data)
+        if expected is not None and freq is not None and freq != expected:
+            raise ValueError(
+                f"All items in a batch should have the same frequency, item {i} has frequency {freq} but the first item has frequency {expected}."
+            )
+
 
-def encode_dataframe(result: pd.DataFrame, timestamp_column: str = None) -> Dict[str, List[Any]]:
-    if timestamp_column and pd.api.types.is_datetime64_any_dtype(result[timestamp_column]):
-        result[timestamp_column] = result[timestamp_column].apply(lambda x: x.isoformat())
-    return result.to_dict(orient="list")
+def _concat_batch(data_list: List[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate the dataframes of a batch, tagging each with its position in the batch."""
+    return pd.concat([d.assign(**{BATCH_ID_COLUMN: i}) for i, d in enumerate(data_list)], ignore_index=True)
+
+
+def encode_dataframe(result: pd.DataFrame, timestamp_column: str = None) -> Dict[str, Union[List[Any], np.ndarray]]:
+    # numeric columns are returned as numpy arrays (views where possible), the conversion to lists
+    # is deferred to PredictOutput serialization; other columns use Series.tolist() which boxes values
+    # (e.g., Timestamps) in a single pass instead of per scalar as in to_dict()
+    # timestamps are formatted into a new series so that the caller's frame is left untouched
+    encoded = {}
+    for c in result.columns:
+        column = result[c]
+        if c == timestamp_column and pd.api.types.is_datetime64_any_dtype(column):
+            column = _isoformat(column)
+        if isinstance(column.dtype, np.dtype) and column.dtype.kind in "biuf":
+            encoded[c] = column.to_numpy()
+        elif getattr(column.dtype, "na_value", None) is pd.NA:
+            # nullable dtypes (e.g., Int64, string) use pd.NA for missing values, which cannot be serialized,
+            # use None as to_dict() does
+            encoded[c] = column.to_numpy(dtype=object, na_value=None).tolist()
+        else:
+            encoded[c] = column.tolist()
+    return encoded
+
+
+def _isoformat(timestamps: pd.Series) -> np.ndarray:
+    """Vectorized ISO 8601 formatting of a datetime series, giving the same strings as calling isoformat() on
+    each value (NaT is rendered as "NaT").
+    """
+    if timestamps.dt.tz is None:
+        return _isoformat_naive(timestamps)
+    # format the local wall time and append the UTC offset, a series only has a few distinct offsets so
+    # those are formatted one by one
+    wall_time = timestamps.dt.tz_localize(None)
+    offsets = (wall_time - timestamps.dt.tz_convert(None)).dt.total_seconds().to_numpy()
+    unique_offsets, inverse = np.unique(offsets, return_inverse=True)
+    suffixes = np.array([_format_utc_offset(o) for o in unique_offsets], dtype=str)
+    return np.char.add(_isoformat_naive(wall_time), suffixes[inverse])
+
+
+def _isoformat_naive(timestamps: pd.Series) -> np.ndarray:
+    # numpy renders naive datetime64 values as ISO 8601 strings in its C core, the unit sets the number of
+    # fractional digits: like isoformat(), none for whole seconds, 6 with microseconds and 9 with nanoseconds
+    values = timestamps.to_numpy()
+    formatted = values.astype("datetime64[s]").astype("<U29")
+    for unit, fraction in [("us", timestamps.dt.microsecond), ("ns", timestamps.dt.nanosecond)]:
+        has_fraction = (fraction.fillna(0) != 0).to_numpy()
+        if has_fraction.any():
+            formatted[has_fraction] = values[has_fraction].astype(f"datetime64[{unit}]").astype(str)
+    return formatted
+
+
+def _format_utc_offset(seconds: float) -> str:
+    """Format a UTC offset as isoformat() does (e.g., +05:30), an empty string for NaT."""
+    if np.isnan(seconds):
+        return ""
+    sign = "-" if seconds < 0 else "+"
+    minutes, seconds = divmod(int(abs(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{sign}{hours:02d}:{minutes:02d}" + (f":{seconds:02d}" if seconds else "")
@@ -1,11 +1,12 @@
 """Inference handler for TSFM models"""
 
 import copy
+import itertools
 import logging
 import tempfile
 from functools import cache
 from pathlib import Path
-from typing import Any, Dict, Optional, Union
+from typing import Any, Dict, List, Optional, Union
 
 import pandas as pd
 import torch
@@ -23,6 +24,24 @@ from .tsfm_util import load_config, load_model, register_config
 LOCAL_FILES_ONLY = not TSFM_ALLOW_LOAD_FROM_HF_HUB
 LOGGER = logging.getLogger(__file__)
 
+# counts requests to spread them over the available GPUs
+_DEVICE_COUNTER = itertools.count()
+
+
+def _select_device() -> str:
+    """Select the device for a request. When several GPUs are available, requests are assigned to them in
+    round-robin fashion.
+
+    Returns:
+        str: The torch device to use.
+    """
+    if not torch.cuda.is_available():
+        return "cpu"
+    num_gpus = torch.cuda.device_count()
+    if num_gpus == 1:
+        return "cuda"
+    return f"cuda:{next(_DEVICE_COUNTER) % num_gpus}"
+
 
 class TSFMForecastingInferenceHandler:
     def __init__(
@@ -51,6 +70,7 @@ class TSFMForecastingInferenceHandler:
         self.config = None
         self.model = None
         self.preprocessor = None
+        self.device = None
 
         # loosen the schema checking when using a saved preprocessor
         self.strict_schema_match = False
@@ -74,15 +94,21 @@ class TSFMForecastingInferenceHandler:
 
     @classmethod
     @cache
-    def _cached_load_model(cls, model_path, config: str, module_path, config_class):
+    def _cached_load_model(cls, model_path, config: str, module_path, config_class, device: str = "cpu"):
+        """Load a model, caching it for the life of the process.
+
+        The cache is unbounded and the device is part of its key: one copy of the model is kept for each config on
+        every device it was requested on, so a model shared between requests is never moved between devices.
+        """
         with tempfile.NamedTemporaryFile(mode="w+", suffix=".json", delete=True) as tmp:
             tmp.write(config)
             tmp.flush()
-            return load_model(
+            model = load_model(
                 model_path=model_path,
                 config=config_class.from_json_file(tmp.name),
                 module_path=module_path,
             )
+        return model.to(device)
 
     def prepare(
         self,
@@ -96,7 +122,7 @@ class TSFMForecastingInferenceHandler:
         preprocessor and forecasting pipeline. This method:
         1) loades the preprocessor, creating a new one if the model does not already have a preprocessor
         2) updates model configuration arguments by calling _get_config_kwargs
-        3) loads the HuggingFace model, passing the updated config object
+        3) loads the HuggingFace model, passing the updated config object, on the device selected for this request
 
         Args:
             data (pd.DataFrame): A pandas dataframe containing historical data.
@@ -196,16 +222,19 @@ class TSFMForecastingInferenceHandler:
         LOGGER.info(f"model_config_kwargs: {model_config_kwargs}")
         model_config = load_config(self.model_path, **model_config_kwargs)
 
+        device = _select_device()
         model = TSFMForecastingInferenceHandler._cached_load_model(
             self.model_path,
             config=model_config.to_json_string(),
             module_path=self.handler_config.module_path,
             config_class=model_config.__class__,
+            device=device,
         )
 
         self.config = model_config
         self.model = model
         self.preprocessor = preprocessor
+        self.device = device
 
     def run(
         self,
@@ -213,11 +242,12 @@ class TSFMForecastingInferenceHandler:
         future_data: Optional[pd.DataFrame] = None,
         schema: Optional[ForecastingMetadataInput] = None,
         parameters: Optional[ForecastingParameters] = None,
+        extra_id_columns: Optional[List[str]] = None,
         **kwargs,
     ) -> pd.DataFrame:
         """Implementation of run for TSFM models.
-        Checks prediction length, data length (both past and future exogenous), configures batch size, determines
-        device and uses the forecasting pipeline to generate forecasts.
+        Checks prediction length, data length (both past and future exogenous), configures batch size, and uses
+        the forecasting pipeline on the device selected during prepare to generate forecasts.
 
         Args:
             data (pd.DataFrame): Input historical time series data.
@@ -227,6 +257,9 @@ class TSFMForecastingInferenceHandler:
                 request. Includes information about columns and their role. Defaults to None.
             parameters (Optional[ForecastingParameters], optional): Parameters from the original inference
                 request. Defaults to None.
+            extra_id_columns (Optional[List[str]], optional): Additional columns identifying separate time series
+                which are not known to the preprocessor, e.g., the artificial id added for batch inference. Defaults
+                to None.
 
         Returns:
             pd.DataFrame: The forecasts produced by the model.
@@ -299,16 +332,21 @@ class TSFMForecastingInferenceHandler:
         )
         LOGGER.info(f"Using inference batch size: {batch_size}")
 
-        device = "cpu" if not torch.cuda.is_available() else "cuda"
+        LOGGER.info(f"Using device: {self.device}")
 
         extra_pipeline_args = getattr(self.handler_config, "extra_pipeline_arguments", {})
+        if extra_id_columns:
+            extra_pipeline_args = {
+                **extra_pipeline_args,
+                "id_columns": extra_id_columns + list(self.preprocessor.id_columns),
+            }
         forecast_pipeline = TimeSeriesForecastingPipeline(
             model=self.model,
             explode_forecasts=True,
             feature_extractor=self.preprocessor,
             add_known_ground_truth=False,
             freq=self.preprocessor.freq,
-            device=device,
+            device=self.device,
             batch_size=1000,
             **extra_pipeline_args,
         )
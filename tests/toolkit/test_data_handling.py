@@ -3,9 +3,22 @@
 
 """Tests data handling functions"""
 
+import os
+import warnings
+from pathlib import Path
+
 import numpy as np
+import pandas as pd
 
 from tsfm_public import load_dataset
+from tsfm_public.toolkit.data_handling import _load_dataset_frame, read_csv_with_parquet_cache
+
+
+def _write_csv(csv_path: Path, offset: float = 0.0) -> Path:
+    """Write a small hourly series with a date and a value column."""
+    df = pd.DataFrame({"date": pd.date_range("2021-01-01", periods=10, freq="h"), "val": np.arange(10.0) + offset})
+    df.to_csv(csv_path, index=False)
+    return csv_path
 
 
 def test_load_dataset():
@@ -18,3 +31,98 @@ def test_load_dataset():
     )
 
     np.testing.assert_allclose([len(x) for x in [dset_train, dset_valid, dset_test]], [8033, 2785, 2785])
+
+
+def test_read_csv_with_parquet_cache(tmp_path):
+    csv_path = _write_csv(tmp_path / "data.csv")
+
+    first = read_csv_with_parquet_cache(csv_path, timestamp_column="date")
+    assert (tmp_path / "data.parquet").is_file()
+    pd.testing.assert_frame_equal(first, pd.read_csv(csv_path, parse_dates=["date"]))
+
+    second = read_csv_with_parquet_cache(csv_path, timestamp_column="date")
+    pd.testing.assert_frame_equal(first, second)
+    assert pd.api.types.is_datetime64_any_dtype(second["date"])
+
+
+def test_read_csv_with_parquet_cache_timestamp_column(tmp_path):
+    csv_path = _write_csv(tmp_path / "data.csv")
+
+    # a cache written without a timestamp column must not be reused when one is requested
+    read_csv_with_parquet_cache(csv_path)
+    data = read_csv_with_parquet_cache(csv_path, timestamp_column="date")
+    pd.testing.assert_frame_equal(data, pd.read_csv(csv_path, parse_dates=["date"]))
+
+    # the cache was rewritten for the new timestamp column and is reused from now on
+    pd.testing.assert_frame_equal(read_csv_with_parquet_cache(csv_path, timestamp_column="date"), data)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["data.csv", "data.parquet"]
+
+
+def test_read_csv_with_parquet_cache_missing_values(tmp_path):
+    csv_path = tmp_path / "data.csv"
+    csv_path.write_text(
+        "date,id,start,val,empty\n"
+        "2021-01-01 00:00:00,a,2021-01-01,1.0,\n"
+        "2021-01-01 01:00:00,NA,2021-01-02,NA,\n"
+        "2021-01-01 02:00:00,,None,,\n"
+        "2021-01-01 03:00:00,b,<NA>,3.0,\n"
+    )
+
+    # the pandas 3 default, missing values must not rely on silent downcasting
+    with pd.option_context("future.no_silent_downcasting", True), warnings.catch_warnings():
+        warnings.simplefilter("error", FutureWarning)
+        for timestamp_column in [None, "date"]:
+            data = read_csv_with_parquet_cache(csv_path, timestamp_column=timestamp_column)
+            expected = pd.read_csv(csv_path, parse_dates=[timestamp_column] if timestamp_column else False)
+            pd.testing.assert_frame_equal(data, expected)
+            # the same when read back from the cache
+            cached = read_csv_with_parquet_cache(csv_path, timestamp_column=timestamp_column)
+            pd.testing.assert_frame_equal(cached, data)
+            assert data["id"].isna().tolist() == [False, True, True, False]
+            # only the timestamp column is parsed as dates
+            assert data["start"].dtype == object
+            assert data["empty"].dtype == np.float64
+
+
+def test_read_csv_with_parquet_cache_column_names(tmp_path):
+    df = pd.DataFrame(
+        {"date": pd.date_range("2021-01-01", periods=10, freq="h"), "val": np.random.rand(10)},
+        index=pd.date_range("2022-01-01", periods=10, freq="D"),
+    )
+
+    # the unnamed index column written by default is named as pandas does, and is not parsed as dates
+    csv_path = tmp_path / "index.csv"
+    df.to_csv(csv_path)
+    data = read_csv_with_parquet_cache(csv_path, timestamp_column="date")
+    assert data.columns.tolist() == ["Unnamed: 0", "date", "val"]
+    assert data["Unnamed: 0"].dtype == object
+    pd.testing.assert_frame_equal(data, pd.read_csv(csv_path, parse_dates=["date"], float_precision="round_trip"))
+
+    # an unnamed column can be the timestamp column
+    data = read_csv_with_parquet_cache(csv_path, timestamp_column="Unnamed: 0")
+    pd.testing.assert_frame_equal(
+        data, pd.read_csv(csv_path, parse_dates=["Unnamed: 0"], float_precision="round_trip")
+    )
+
+    # duplicate names are renamed by pandas
+    csv_path = tmp_path / "duplicates.csv"
+    df.rename(columns={"val": "date"}).to_csv(csv_path, index=False)
+    data = read_csv_with_parquet_cache(csv_path, timestamp_column="date")
+    assert data.columns.tolist() == ["date", "date.1"]
+    pd.testing.assert_frame_equal(data, read_csv_with_parquet_cache(csv_path, timestamp_column="date"))
+
+
+def test_load_dataset_frame_is_reused(tmp_path):
+    csv_path = _write_csv(tmp_path / "data.csv")
+
+    first = _load_dataset_frame(str(csv_path), "date", False)
+    assert _load_dataset_frame(str(csv_path), "date", False) is first
+    assert not (tmp_path / "data.parquet").exists()
+
+    # a rewritten file is loaded again
+    _write_csv(csv_path, offset=1.0)
+    # make sure the modification time changes, also on file systems with a coarse resolution
+    os.utime(csv_path, ns=(os.stat(csv_path).st_atime_ns, os.stat(csv_path).st_mtime_ns + 1_000_000))
+    second = _load_dataset_frame(str(csv_path), "date", False)
+    assert second is not first
+    pd.testing.assert_frame_equal(second, pd.read_csv(csv_path, parse_dates=["date"]))
@@ -4,8 +4,8 @@
 
 import argparse
 import logging
-import os
 import tempfile
+from pathlib import Path
 
 import torch
 
@@ -232,22 +232,21 @@ def get_ttm_args():  # pragma: no cover
     # Calculate number of gpus
     if args.num_gpus is None:
         args.num_gpus = torch.cuda.device_count()
-        logger.info(f"Automatically calculated number of GPUs ={args.num_gpus}")
+        logger.info("Automatically calculated number of GPUs = %d", args.num_gpus)
 
     # Create save directory
-    args.save_dir = os.path.join(
-        args.save_dir,
-        f"TTM_cl-{args.context_length}_fl-{args.forecast_length}_pl-{args.patch_length}_apl-{args.adaptive_patching_levels}_ne-{args.num_epochs}_es-{args.early_stopping}",
+    save_dir = (
+        Path(args.save_dir)
+        / f"TTM_cl-{args.context_length}_fl-{args.forecast_length}_pl-{args.patch_length}_apl-{args.adaptive_patching_levels}_ne-{args.num_epochs}_es-{args.early_stopping}"
     )
-    os.makedirs(args.save_dir, exist_ok=True)
+    save_dir.mkdir(parents=True, exist_ok=True)
+    # keep a string for downstream code which builds paths with os.path.join or f-strings
+    args.save_dir = str(save_dir)
 
     return args
 
 
 def int_to_bool(value):  # pragma: no cover
-    if value == 0:
-        return False
-    elif value == 1:
-        return True
-    else:
+    if value not in (0, 1):
         raise argparse.ArgumentTypeError("Boolean value expected (0 or 1)")
+    return bool(value)
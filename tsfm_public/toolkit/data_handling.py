@@ -2,19 +2,63 @@
 #
 """Utilities for handling datasets"""
 
+import copy
+import csv
+import json
 import logging
+import os
+import uuid
+from functools import cache, lru_cache
 from importlib import resources
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, List, Optional, Union
 
+import numpy as np
 import pandas as pd
 import yaml
 
 from .time_series_preprocessor import TimeSeriesPreprocessor, get_datasets
 
 
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+
+    HAVE_PYARROW = True
+except ImportError:
+    HAVE_PYARROW = False
+
 LOGGER = logging.getLogger(__file__)
 
+# schema metadata entry recording how a Parquet cache was parsed from its CSV file, bump the version whenever
+# the parsing changes so that existing caches are rebuilt
+_PARQUET_CACHE_KEY = b"tsfm_public.csv_cache"
+_PARQUET_CACHE_VERSION = 3
+
+# strings read as missing values by default in `pd.read_csv`
+_CSV_NULL_VALUES = [
+    "",
+    "#N/A",
+    "#N/A N/A",
+    "#NA",
+    "-1.#IND",
+    "-1.#QNAN",
+    "-NaN",
+    "-nan",
+    "1.#IND",
+    "1.#QNAN",
+    "<NA>",
+    "N/A",
+    "NA",
+    "NULL",
+    "NaN",
+    "None",
+    "n/a",
+    "nan",
+    "null",
+]
+
 
 def load_dataset(
     dataset_name: str,
@@ -27,22 +71,41 @@ def load_dataset(
     use_frequency_token: bool = False,
     enable_padding: bool = True,
     seed: int = 42,
+    use_parquet_cache: bool = True,
     **dataset_kwargs,
 ):
-    LOGGER.info(f"Dataset name: {dataset_name}, context length: {context_length}, prediction length {forecast_length}")
+    """Load one of the benchmark datasets with a bundled config and split it into train, validation and test
+    datasets.
 
-    config_path = resources.files("tsfm_public.resources.data_config")
-    names_to_config = {p.stem: p for p in config_path.iterdir() if p.suffix == ".yaml"}
+    The raw frames of the two most recently loaded files stay in memory for the life of the process, so that
+    repeated calls (e.g., zero-shot followed by few-shot) do not read the file again. A local file that was
+    modified since it was loaded is read again.
 
-    config_path = names_to_config.get(dataset_name, None)
+    Args:
+        dataset_name (str): Name of the dataset, one of the bundled dataset configs.
+        context_length (int): Context length of the model.
+        forecast_length (int): Forecast length of the model.
+        fewshot_fraction (float, optional): Fraction of the training data to return. Defaults to 1.0.
+        fewshot_location (str, optional): Where the fewshot data is chosen, see `get_datasets`. Defaults to "first".
+        dataset_root_path (str, optional): Folder containing the datasets. Defaults to "datasets/".
+        dataset_path (Optional[str], optional): Path or URL of the data file, overrides the location from the
+            config. Defaults to None.
+        use_frequency_token (bool, optional): If True, datasets include the frequency token. Defaults to False.
+        enable_padding (bool, optional): If True, datasets are created with padding. Defaults to True.
+        seed (int, optional): Seed to use. Defaults to 42.
+        use_parquet_cache (bool, optional): If True, local CSV files are cached as Parquet files next to them, see
+            `read_csv_with_parquet_cache`. Defaults to True.
+        dataset_kwargs: Additional keyword arguments passed to `get_datasets`.
 
-    if config_path is None:
-        raise ValueError(
-            f"Currently the `load_dataset()` function supports the following datasets: {names_to_config.keys()}\n \
-                         For other datasets, please provide the proper configs to the TimeSeriesPreprocessor (TSP) module."
-        )
+    Returns:
+        Tuple of pytorch datasets, including: train, validation, test.
+    """
+    LOGGER.info(
+        "Dataset name: %s, context length: %s, prediction length %s", dataset_name, context_length, forecast_length
+    )
 
-    config = yaml.safe_load(open(config_path, "r"))
+    # copy since the preprocessor and split logic may hold on to (and modify) the lists in the config
+    config = copy.deepcopy(_get_dataset_config(dataset_name))
 
     tsp = TimeSeriesPreprocessor(
         id_columns=config["id_columns"],
@@ -66,10 +129,9 @@ def load_dataset(
     if dataset_path is None:
         dataset_path = Path(dataset_root_path) / config["data_path"] / config["data_file"]
 
-    data = pd.read_csv(
-        dataset_path,
-        parse_dates=[config["timestamp_column"]],
-    )
+    # the loaded frame is reused across calls (e.g., zero-shot followed by few-shot on the same dataset),
+    # get_datasets() works on a copy so it is not modified
+    data = _load_dataset_frame(str(dataset_path), config["timestamp_column"], use_parquet_cache)
 
     train_dataset, valid_dataset, test_dataset = get_datasets(
         tsp,
@@ -82,6 +144,198 @@ def load_dataset(
         seed=seed,
         **dataset_kwargs,
     )
-    LOGGER.info(f"Data lengths: train = {len(train_dataset)}, val = {len(valid_dataset)}, test = {len(test_dataset)}")
+    LOGGER.info(
+        "Data lengths: train = %d, val = %d, test = %d", len(train_dataset), len(valid_dataset), len(test_dataset)
+    )
 
     return train_dataset, valid_dataset, test_dataset
+
+
+@cache
+def _get_dataset_config_paths() -> Dict[str, Path]:
+    """Map dataset names to their bundled config files, scanning the resources folder only once."""
+    config_path = resources.files("tsfm_public.resources.data_config")
+    return {p.stem: p for p in config_path.iterdir() if p.suffix == ".yaml"}
+
+
+@cache
+def _get_dataset_config(dataset_name: str) -> Dict[str, Any]:
+    """Load and parse the config for a dataset, parsing each YAML file only once.
+
+    The returned dict is shared between calls and should not be modified, copy it first.
+    """
+    names_to_config = _get_dataset_config_paths()
+
+    try:
+        config_path = names_to_config[dataset_name]
+    except KeyError:
+        raise ValueError(
+            f"Currently the `load_dataset()` function supports the following datasets: {names_to_config.keys()}\n \
+                         For other datasets, please provide the proper configs to the TimeSeriesPreprocessor (TSP) module."
+        ) from None
+
+    with open(config_path, "r") as f:
+        return yaml.safe_load(f)
+
+
+def _load_dataset_frame(dataset_path: str, timestamp_column: str, use_parquet_cache: bool) -> pd.DataFrame:
+    """Load the data for a dataset, keeping the two most recently used frames in memory.
+
+    Local files are loaded again when they were modified since they were cached. The returned frame is shared
+    between calls and should not be modified.
+    """
+    return _load_dataset_frame_cached(dataset_path, timestamp_column, use_parquet_cache, _mtime_ns(dataset_path))
+
+
+@lru_cache(maxsize=2)
+def _load_dataset_frame_cached(
+    dataset_path: str, timestamp_column: str, use_parquet_cache: bool, mtime_ns: Optional[int]
+) -> pd.DataFrame:
+    # mtime_ns is only part of the cache key
+    if use_parquet_cache:
+        return read_csv_with_parquet_cache(dataset_path, timestamp_column=timestamp_column)
+    return pd.read_csv(dataset_path, parse_dates=[timestamp_column])
+
+
+def _mtime_ns(path: str) -> Optional[int]:
+    """Modification time of a local file, None for remote or missing files."""
+    try:
+        return os.stat(path).st_mtime_ns
+    except (OSError, ValueError):
+        return None
+
+
+def read_csv_with_parquet_cache(
+    dataset_path: Union[str, Path], timestamp_column: Optional[str] = None
+) -> pd.DataFrame:
+    """Read a local CSV file, caching the parsed result in a Parquet file next to it.
+
+    The first read parses the CSV and writes `<name>.parquet` alongside it; later reads load the Parquet file
+    directly, which avoids re-parsing the CSV and the timestamps. The cache is ignored if it is older than the
+    CSV file or was written with a different `timestamp_column`. Remote paths (e.g., URLs) are read directly
+    without caching, as are all files when pyarrow is not installed.
+
+    Args:
+        dataset_path (Union[str, Path]): Path to the CSV file.
+        timestamp_column (Optional[str], optional): Column to parse as dates. Defaults to None.
+
+    Returns:
+        pd.DataFrame: The loaded data.
+    """
+    csv_path = Path(dataset_path)
+    if not HAVE_PYARROW or "://" in str(dataset_path) or not csv_path.is_file():
+        return pd.read_csv(dataset_path, parse_dates=[timestamp_column] if timestamp_column else False)
+
+    cache_path = csv_path.with_suffix(".parquet")
+    cache_key = json.dumps({"version": _PARQUET_CACHE_VERSION, "timestamp_column": timestamp_column}).encode()
+    if _is_valid_parquet_cache(cache_path, csv_path, cache_key):
+        return _none_to_nan(pd.read_parquet(cache_path))
+
+    data = _read_local_csv(csv_path, timestamp_column=timestamp_column)
+    _write_parquet_cache(data, cache_path, cache_key)
+    return data
+
+
+def _is_valid_parquet_cache(cache_path: Path, csv_path: Path, cache_key: bytes) -> bool:
+    """Check that the cache exists, is not older than the CSV file and was parsed with the same options."""
+    try:
+        if cache_path.stat().st_mtime < csv_path.stat().st_mtime:
+            return False
+        metadata = pq.read_schema(cache_path).metadata or {}
+    except (OSError, pa.ArrowInvalid):
+        return False
+    return metadata.get(_PARQUET_CACHE_KEY) == cache_key
+
+
+def _write_parquet_cache(data: pd.DataFrame, cache_path: Path, cache_key: bytes):
+    """Write the cache to a temporary file and move it into place.
+
+    The move is atomic, so concurrent readers (e.g., other DDP ranks) never see a partially written cache.
+    """
+    tmp_path = cache_path.with_name(f".{cache_path.name}.{os.getpid()}.{uuid.uuid4().hex}.tmp")
+    try:
+        table = pa.Table.from_pandas(data)
+        table = table.replace_schema_metadata({**table.schema.metadata, _PARQUET_CACHE_KEY: cache_key})
+        pq.write_table(table, tmp_path, compression="zstd")
+        os.replace(tmp_path, cache_path)
+    except Exception as e:
+        # caching is best effort, e.g., the directory may be read-only
+        LOGGER.warning("Unable to write parquet cache %s: %s", cache_path, e)
+        tmp_path.unlink(missing_ok=True)
+
+
+def _read_local_csv(csv_path: Path, timestamp_column: Optional[str] = None) -> pd.DataFrame:
+    """Read a local CSV file using the multithreaded pyarrow reader when available.
+
+    The reader is configured to give the same frame as `pd.read_csv` with `parse_dates`: the timestamp column is
+    pinned to nanosecond resolution, missing values follow the pandas defaults (also in string columns), other
+    date or time columns are left as strings and empty column names become `Unnamed: <position>`. Files with
+    duplicate column names, which pandas renames, are left to `pd.read_csv`. Unlike the default pandas parser,
+    pyarrow parses floats with correct rounding, so values may differ from `pd.read_csv` in the last digit
+    (they match `float_precision="round_trip"`). Falls back to `pd.read_csv` if pyarrow is missing or cannot
+    parse the file.
+    """
+    if HAVE_PYARROW:
+        try:
+            column_names = _read_csv_header(csv_path)
+            if len(set(column_names)) == len(column_names):
+                return _read_arrow_csv_frame(csv_path, column_names, timestamp_column)
+            LOGGER.info("Falling back to pandas CSV reader for %s: duplicate column names", csv_path)
+        except (pa.ArrowInvalid, UnicodeDecodeError) as e:
+            LOGGER.info("Falling back to pandas CSV reader for %s: %s", csv_path, e)
+
+    return pd.read_csv(csv_path, parse_dates=[timestamp_column] if timestamp_column else False)
+
+
+def _read_csv_header(csv_path: Path) -> List[str]:
+    """Read the column names of a CSV file, naming empty ones `Unnamed: <position>` as pandas does."""
+    with open(csv_path, newline="", encoding="utf-8-sig") as f:
+        header = next(csv.reader(f), [])
+    return [name or f"Unnamed: {i}" for i, name in enumerate(header)]
+
+
+def _read_arrow_csv_frame(csv_path: Path, column_names: List[str], timestamp_column: Optional[str]) -> pd.DataFrame:
+    """Read a CSV file with pyarrow and convert it to a frame with the dtypes `pd.read_csv` gives."""
+    column_types = {timestamp_column: pa.timestamp("ns")} if timestamp_column else {}
+    table = _read_arrow_csv(csv_path, column_names, column_types)
+    # pyarrow always infers dates and times, re-read such columns as strings (rarely needed, datasets
+    # usually have a single timestamp column)
+    inferred = {
+        f.name: pa.string() for f in table.schema if f.name not in column_types and pa.types.is_temporal(f.type)
+    }
+    if inferred:
+        table = _read_arrow_csv(csv_path, column_names, {**column_types, **inferred})
+    # columns with only missing values have the null type, pandas reads them as floats
+    null_columns = [f.name for f in table.schema if pa.types.is_null(f.type)]
+    if null_columns:
+        table = table.cast(
+            pa.schema(
+                [f.with_type(pa.float64()) if f.name in null_columns else f for f in table.schema],
+                metadata=table.schema.metadata,
+            )
+        )
+    return _none_to_nan(table.to_pandas())
+
+
+def _read_arrow_csv(csv_path: Path, column_names: List[str], column_types: Dict[str, Any]) -> "pa.Table":
+    """Read a CSV file with pyarrow, treating the same strings as missing values and booleans as pandas does."""
+    read_options = pa_csv.ReadOptions(column_names=column_names, skip_rows=1)
+    convert_options = pa_csv.ConvertOptions(
+        column_types=column_types,
+        null_values=_CSV_NULL_VALUES,
+        true_values=["True", "TRUE", "true"],
+        false_values=["False", "FALSE", "false"],
+        strings_can_be_null=True,
+    )
+    return pa_csv.read_csv(csv_path, read_options=read_options, convert_options=convert_options)
+
+
+def _none_to_nan(data: pd.DataFrame) -> pd.DataFrame:
+    """Replace the None pyarrow gives for missing values in object columns with NaN, as `pd.read_csv` does."""
+    for i in np.flatnonzero(data.dtypes.map(pd.api.types.is_object_dtype)):
+        values = data.iloc[:, i].to_numpy(copy=True)
+        missing = pd.isna(values)
+        if missing.any():
+            values[missing] = np.nan
+            data.isetitem(i, values)
+    return data.infer_objects(copy=False)